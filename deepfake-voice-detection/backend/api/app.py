@@ -1,8 +1,13 @@
-from fastapi import FastAPI, UploadFile, File, HTTPException, WebSocket, Form
+from fastapi import FastAPI, UploadFile, File, HTTPException, WebSocket, Form, Request, Header
 from fastapi.middleware.cors import CORSMiddleware
-from api.websockets import websocket_endpoint
-from realtime.inference_engine import DeepfakeDetector
+from fastapi.responses import StreamingResponse
+from api.websockets import websocket_endpoint, detector
+from api.schemas import ModelReloadRequest
+from realtime.inference_engine import MODELS_DIR
 from realtime.call_stats import call_stats
+from realtime.load_governor import load_governor, OverloadedError, BACKGROUND_PRIORITY
+from realtime.stream_analyzer import analyze_stream, format_event, STREAM_BATCH_SIZE, MIN_HOP_SECONDS, MAX_WINDOW_SECONDS
+from realtime.profiler import profiler
 import io
 import librosa
 import numpy as np
@@ -10,6 +15,8 @@ import os
 import shutil
 import glob
 import sys
+import signal
+import asyncio
 
 app = FastAPI()
 
@@ -53,14 +60,38 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Initialize AI Model
-detector = DeepfakeDetector()
+# AI Model is created in websockets.py and shared here, so a hot-swap
+# reaches both the HTTP and WebSocket paths.
+
+# --- ADMIN AUTH ---
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN")
+
+def require_admin(token):
+    # Admin endpoints are disabled entirely unless ADMIN_TOKEN is set
+    if not ADMIN_TOKEN or token != ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Admin token required")
+
+# --- ON-DEMAND PROFILING ---
+# `kill -USR1 <pid>` captures the next 20 windows without touching the API.
+# Registered on the event loop so profiler.start() runs as a normal callback,
+# never inside a raw signal handler that could interrupt start()/stop() mid-lock.
+@app.on_event("startup")
+async def install_profile_signal():
+    if hasattr(signal, "SIGUSR1"):
+        asyncio.get_running_loop().add_signal_handler(signal.SIGUSR1, profiler.start)
 
 @app.websocket("/ws/audio") 
 async def audio_socket(websocket: WebSocket):
     # This invokes the handler in websockets.py which does the actual accept()
     await websocket_endpoint(websocket)
 
+def overloaded_response(error: OverloadedError):
+    return HTTPException(
+        status_code=503,
+        detail="Server overloaded, retry later",
+        headers={"Retry-After": str(max(1, int(round(error.retry_after))))}
+    )
+
 @app.post("/analyze-file")
 async def analyze_file(file: UploadFile = File(...)):
     try:
@@ -70,12 +101,51 @@ async def analyze_file(file: UploadFile = File(...)):
         if len(audio_array) > 64000:
             audio_array = audio_array[:64000]
             
-        result = detector.predict(audio_array)
+        result = await load_governor.run(detector.predict, audio_array, priority=BACKGROUND_PRIORITY)
         return result
+    except OverloadedError as e:
+        raise overloaded_response(e)
     except Exception as e:
         print(f"File Error: {e}")
         raise HTTPException(status_code=500, detail="Could not process audio file")
 
+@app.post("/analyze-stream")
+async def analyze_stream_endpoint(
+    request: Request,
+    window: float = 4.0,
+    hop: float = 2.0,
+    format: str = "ndjson"
+):
+    """
+    Analyze a long recording of any length while it is still uploading.
+    Send the raw encoded audio as the request body (not multipart), e.g.
+        curl -T call.flac "http://localhost:8000/analyze-stream?hop=2"
+    Streams one result per window plus a running verdict (NDJSON or SSE),
+    then a final event with the full time-aligned timeline.
+    """
+    if format not in ("ndjson", "sse"):
+        raise HTTPException(status_code=400, detail="format must be 'ndjson' or 'sse'")
+    if window > MAX_WINDOW_SECONDS:
+        # Longer windows would be cut to 4 s while the timeline claims the full span
+        raise HTTPException(status_code=400, detail=f"window must be <= {MAX_WINDOW_SECONDS} seconds")
+    if not MIN_HOP_SECONDS <= hop <= window or int(hop * 16000) < 1 or int(window * 16000) < 1:
+        raise HTTPException(status_code=400, detail=f"Need {MIN_HOP_SECONDS} <= hop <= window")
+    if not shutil.which("ffmpeg"):
+        raise HTTPException(status_code=503, detail="FFmpeg is required for stream decoding")
+    try:
+        load_governor.check_admission()
+    except OverloadedError as e:
+        raise overloaded_response(e)
+
+    async def event_stream():
+        batch_size = detector.serving_profile.get("batch_size", STREAM_BATCH_SIZE)
+        async for event in analyze_stream(request.stream(), detector, window, hop,
+                                          batch_size=batch_size, governor=load_governor):
+            yield format_event(event, format)
+
+    media_type = "text/event-stream" if format == "sse" else "application/x-ndjson"
+    return StreamingResponse(event_stream(), media_type=media_type)
+
 @app.post("/analyze-chunk")
 async def analyze_chunk(
     file: UploadFile = File(...),
@@ -88,6 +158,21 @@ async def analyze_chunk(
     """
     temp_filename = None
     try:
+        # Admission control: decided calls yield to undecided ones under load
+        stats = call_stats.get_stats(call_id) if call_id else {}
+        risk = stats.get("risk_score", 0.0)
+        total = stats.get("total_chunks", 0)
+
+        if call_id and load_governor.should_defer(risk, total):
+            # The chunk is never scored, so don't hand back a result the client
+            # would store as this chunk's analysis: it just skips the chunk
+            raise HTTPException(
+                status_code=503,
+                detail="Chunk skipped: call already decided, server under load",
+                headers={"Retry-After": "1"}
+            )
+        load_governor.check_admission()
+
         contents = await file.read()
         
         # Write to temp file to help librosa/ffmpeg detect format
@@ -115,7 +200,10 @@ async def analyze_chunk(
             audio_array = audio_array[:target_samples]
         
         # 1. Run Exact Same Inference as File Upload
-        result = detector.predict(audio_array)
+        result = await load_governor.run(
+            detector.predict, audio_array,
+            priority=load_governor.priority(risk, total)
+        )
         
         # 2. Extract Labels
         is_deepfake = result.get("label") == "FAKE"
@@ -136,6 +224,8 @@ async def analyze_chunk(
 
     except HTTPException:
         raise
+    except OverloadedError as e:
+        raise overloaded_response(e)
     except Exception as e:
         print(f"Chunk Analysis Error: {e}")
         import traceback
@@ -151,4 +241,71 @@ async def analyze_chunk(
 
 @app.get("/")
 def health_check():
-    return {"status": "Deepfake Detector Live"}
\ No newline at end of file
+    return {"status": "Deepfake Detector Live"}
+
+@app.get("/load")
+def load_status():
+    return load_governor.status()
+
+# --- ADMIN: ZERO-DOWNTIME MODEL HOT-SWAP ---
+
+@app.get("/admin/model")
+def model_status(x_admin_token: str = Header(None)):
+    require_admin(x_admin_token)
+    return detector.status()
+
+@app.post("/admin/model/reload")
+def model_reload(req: ModelReloadRequest, x_admin_token: str = Header(None)):
+    """
+    Loads + warms a new checkpoint in the background, then swaps it in between
+    batches (or keeps it in shadow mode when shadow_rate > 0). Poll GET /admin/model.
+    """
+    require_admin(x_admin_token)
+
+    # torch.load unpickles, so only accept files from the models folder
+    models_dir = os.path.realpath(MODELS_DIR)
+    model_path = os.path.realpath(req.path)
+    if os.path.commonpath([models_dir, model_path]) != models_dir:
+        raise HTTPException(status_code=400, detail="Model path must be inside the models folder")
+    if not os.path.exists(model_path):
+        raise HTTPException(status_code=404, detail="Model file not found")
+
+    if not detector.reload(model_path, shadow_rate=req.shadow_rate):
+        raise HTTPException(status_code=409, detail="A reload is already in progress")
+    return detector.status()
+
+@app.post("/admin/model/promote")
+def model_promote(x_admin_token: str = Header(None)):
+    require_admin(x_admin_token)
+    if not detector.promote():
+        raise HTTPException(status_code=409, detail="No shadow candidate to promote")
+    return detector.status()
+
+@app.post("/admin/model/discard")
+def model_discard(x_admin_token: str = Header(None)):
+    require_admin(x_admin_token)
+    if not detector.discard_candidate():
+        raise HTTPException(status_code=409, detail="No shadow candidate to discard")
+    return detector.status()
+
+# --- ADMIN: PROFILING ---
+
+@app.post("/admin/profile")
+async def profile_capture(windows: int = 20, torch_trace: bool = True, x_admin_token: str = Header(None)):
+    """
+    Profiles the next N windows through predict() and the WebSocket loop.
+    Files land in profiles/<timestamp>/ (Chrome trace, folded stacks, summary).
+    """
+    require_admin(x_admin_token)
+    if not 1 <= windows <= 1000:
+        raise HTTPException(status_code=400, detail="windows must be between 1 and 1000")
+
+    capture_dir = profiler.start(windows=windows, torch_trace=torch_trace)
+    if capture_dir is None:
+        raise HTTPException(status_code=409, detail="A capture is already running or still being written")
+    return {"status": "armed", "windows": windows, "path": capture_dir}
+
+@app.get("/admin/profile")
+def profile_status(x_admin_token: str = Header(None)):
+    require_admin(x_admin_token)
+    return profiler.status()
@@ -0,0 +1,7 @@
+from pydantic import BaseModel, Field
+
+class ModelReloadRequest(BaseModel):
+    # Checkpoint (.pth) or TorchScript export (.pt / .ts), relative to backend/
+    path: str = "models/weights.pth"
+    # 0 = swap as soon as warm, >0 = score this fraction of traffic in shadow first
+    shadow_rate: float = Field(0.0, ge=0.0, le=1.0)
@@ -2,12 +2,18 @@ from fastapi import WebSocket, WebSocketDisconnect
 import numpy as np
 import sys
 import os
+import uuid
 
 # Ensure imports work
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from realtime.sliding_window import SlidingWindowBuffer
 from realtime.inference_engine import DeepfakeDetector
+from realtime.call_stats import call_stats
+from realtime.load_governor import load_governor, OverloadedError
+from realtime.profiler import profiler
+
+WS_CLOSE_TRY_AGAIN_LATER = 1013
 
 # ⚡ CRITICAL FIX: Initialize the model here so this file can use it
 print("🔌 Initializing AI for WebSockets...")
@@ -15,13 +21,28 @@ detector = DeepfakeDetector()
 
 async def websocket_endpoint(websocket: WebSocket):
     await websocket.accept()
+
+    # Past the hard limit, refuse new calls instead of slowing everyone down
+    try:
+        load_governor.check_admission()
+    except OverloadedError:
+        print("⛔ Rejecting WebSocket: inference overloaded")
+        await websocket.close(code=WS_CLOSE_TRY_AGAIN_LATER, reason="Server overloaded, retry later")
+        return
+
     print("✅ Client Connected to WebSocket")
     
     # Window size: 2.5s (Matches the frontend/backend logic we discussed)
     buffer = SlidingWindowBuffer(window_size_seconds=2.5) 
     
+    session_id = f"ws-{uuid.uuid4().hex[:8]}"
     session_scores = [] 
     chunks_received = 0 
+
+    # Streaming model (USE_STREAMING_MODEL=1) only processes the audio added since the last hop
+    streaming = detector.streaming_model is not None
+    if streaming:
+        detector.open_stream(session_id)
     
     try:
         while True:
@@ -32,25 +53,64 @@ async def websocket_endpoint(websocket: WebSocket):
                 buffer.add_chunk(data)
                 chunks_received += 1
                 
-                # Process only when buffer is full
-                if buffer.is_ready():
+                # Process only when buffer is full and a (load-adjusted) hop has passed.
+                # Base hop = one client chunk (LiveCallStreamer sends ~1.4k samples at
+                # 16 kHz), so NORMAL load keeps one inference per chunk; the governor
+                # stretches it when the model falls behind.
+                chunk_samples = len(data) // 4  # float32
+                hop_samples = int(chunk_samples * load_governor.hop_multiplier())
+                if buffer.is_ready() and buffer.new_samples >= hop_samples:
+                    stats = call_stats.get_stats(session_id)
+                    risk = stats.get("risk_score", 0.0)
+                    total = stats.get("total_chunks", 0)
+
+                    # Already confidently decided -> give the slot to undecided calls
+                    if load_governor.should_defer(risk, total):
+                        buffer.get_buffer()
+                        if streaming:
+                            detector.mark_stream_gap(session_id)
+                        await websocket.send_json({"status": "deferred", "summary": stats})
+                        continue
+
+                    new_samples = buffer.new_samples
                     audio_input = buffer.get_buffer()
+                    if streaming:
+                        infer_fn, infer_args = detector.predict_stream, (session_id, audio_input[-new_samples:], audio_input)
+                    else:
+                        infer_fn, infer_args = detector.predict, (audio_input,)
                     
-                   # 🔍 RUN INFERENCE
-                    result = detector.predict(audio_input)
+                   # 🔍 RUN INFERENCE (queued by priority, off the event loop)
+                    try:
+                        # Queue wait + predict, as seen from the event loop
+                        with profiler.stage("ws.inference"):
+                            result = await load_governor.run(
+                                infer_fn, *infer_args,
+                                priority=load_governor.priority(risk, total)
+                            )
+                    except OverloadedError as e:
+                        if streaming:
+                            detector.mark_stream_gap(session_id)
+                        await websocket.send_json({"status": "throttled", "retry_after": e.retry_after})
+                        continue
                     
+                    if result.get("label") == "ANALYZING":
+                        continue
+
                     # Store verdict
                     is_fake = 1 if result.get("label") == "FAKE" else 0
                     session_scores.append(is_fake)
+                    if result.get("label") != "ERROR":
+                        call_stats.update_stats(session_id, result.get("label"), result.get("confidence", 0.0))
                     
                     # Send Live Updates (Safe Mode)
-                    await websocket.send_json({
-                        "status": "processing",
-                        "live_label": result.get("label", "ANALYZING"),
-                        "live_confidence": result.get("confidence", 0.0),
-                        "energy": result.get("energy", 0.0),       # .get() prevents crash
-                        "artifacts": result.get("artifacts", 0.0)  # .get() prevents crash
-                    })
+                    with profiler.stage("ws.send"):
+                        await websocket.send_json({
+                            "status": "processing",
+                            "live_label": result.get("label", "ANALYZING"),
+                            "live_confidence": result.get("confidence", 0.0),
+                            "energy": result.get("energy", 0.0),       # .get() prevents crash
+                            "artifacts": result.get("artifacts", 0.0)  # .get() prevents crash
+                        })
 
             elif "text" in message:
                 if message["text"] == "STOP":
@@ -81,4 +141,7 @@ async def websocket_endpoint(websocket: WebSocket):
         print("❌ Client disconnected")
     except Exception as e:
         print(f"🔥 CRITICAL ERROR in WebSocket: {e}")
-        await websocket.close()
\ No newline at end of file
+        await websocket.close()
+    finally:
+        call_stats.end_call(session_id)
+        detector.close_stream(session_id)
\ No newline at end of file
@@ -0,0 +1,174 @@
+"""
+Accuracy + compute comparison: StreamingDeepFake vs the ResNetDeepFake baseline.
+
+Usage (from backend/, after training both models):
+    python train.py                              # -> models/weights.pth
+    MODEL_TYPE=streaming python train.py         # -> models/streaming_weights.pth
+    python evaluation/compare_streaming.py --data data_eval
+
+`--data` is a folder with 'real' and 'fake' subfolders, laid out like data/
+(use held-out files, e.g. the ASVspoof dev split, not the training set).
+
+Both models are driven exactly like api/websockets.py serves them: a 2.5 s
+SlidingWindowBuffer fed one client chunk at a time, scored once the window is
+full, with the streaming state rebuilt from that window every 4 s. Per-hop
+cost is amortised over a long clip, so it includes those rebuilds.
+
+    python evaluation/compare_streaming.py --check   # chunked == whole-clip, no weights needed
+"""
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+
+import librosa
+import numpy as np
+import torch
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from evaluation.metrics import accuracy, equal_error_rate
+from models.streaming_model import StreamingDeepFake
+from realtime.inference_engine import DeepfakeDetector, STREAMING_MODEL_PATH
+from realtime.sliding_window import SlidingWindowBuffer
+from utils.features import extract_log_mel_frames, StreamingLogMel
+
+SR = 16000
+WINDOW_SECONDS = 2.5   # Live WebSocket window
+CHUNK_SAMPLES = 1365   # One LiveCallStreamer chunk (4096 samples at 48 kHz -> 16 kHz) = live base hop
+TIMING_SECONDS = 20.0  # Clip length the per-hop cost is amortised over
+
+def list_files(data_dir, limit):
+    files = []
+    for label, folder in ((0, "real"), (1, "fake")):
+        paths = sorted(glob.glob(os.path.join(data_dir, folder, "*")))
+        paths = [p for p in paths if p.endswith(('.wav', '.flac', '.mp3'))][:limit]
+        files += [(p, label) for p in paths]
+    return files
+
+def serve_clip(detector, audio, streaming):
+    """
+    Feeds a clip chunk by chunk the way the WebSocket path does.
+    Returns (final P(FAKE), seconds spent in inference per hop).
+    """
+    buffer = SlidingWindowBuffer(window_size_seconds=WINDOW_SECONDS, sr=SR)
+    if streaming:
+        detector.open_stream("eval")
+    result, hop_times = {}, []
+    for start in range(0, len(audio), CHUNK_SAMPLES):
+        buffer.add_chunk(audio[start:start + CHUNK_SAMPLES].astype(np.float32).tobytes())
+        if not buffer.is_ready():
+            continue
+        new_samples = buffer.new_samples
+        audio_input = buffer.get_buffer()
+        t = time.perf_counter()
+        if streaming:
+            result = detector.predict_stream("eval", audio_input[-new_samples:], audio_input)
+        else:
+            result = detector.predict(audio_input)
+        hop_times.append(time.perf_counter() - t)
+    if streaming:
+        detector.close_stream("eval")
+    return result.get("confidence", 0.0), hop_times
+
+def check_streaming_equivalence(chunk_sizes=(1365, 400, 4000, 160)):
+    """
+    Chunked processing must match whole-clip processing: StreamingLogMel vs
+    extract_log_mel_frames, and forward_step with carried state vs forward()
+    (random weights, eval mode). Returns True if both match.
+    """
+    rng = np.random.default_rng(0)
+    audio = rng.standard_normal(4 * SR).astype(np.float32) * 0.1
+
+    whole = extract_log_mel_frames(audio, sr=SR, duration=4.0)
+    features, chunks, start, i = StreamingLogMel(SR), [], 0, 0
+    while start < len(audio):
+        size = chunk_sizes[i % len(chunk_sizes)]
+        chunks.append(features.push(audio[start:start + size]))
+        start, i = start + size, i + 1
+    chunked = torch.cat(chunks, dim=1)
+    features_ok = chunked.shape == whole.shape and torch.allclose(chunked, whole, atol=1e-4)
+
+    torch.manual_seed(0)
+    model = StreamingDeepFake().eval()
+    with torch.no_grad():
+        expected = model(whole.unsqueeze(0))
+        state, logits = None, None
+        for part in torch.split(whole.unsqueeze(0), 7, dim=2):
+            logits, state = model.forward_step(part, state)
+    model_ok = torch.allclose(logits, expected, atol=1e-4)
+
+    print(f"{'✅' if features_ok else '❌'} StreamingLogMel chunked == whole clip {tuple(chunked.shape)} vs {tuple(whole.shape)}")
+    print(f"{'✅' if model_ok else '❌'} StreamingDeepFake forward_step chunked == forward")
+    return features_ok and model_ok
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--data", default="data")
+    parser.add_argument("--limit", type=int, default=500, help="Max files per class")
+    parser.add_argument("--out", default=os.path.join("evaluation", "streaming_vs_resnet.json"))
+    parser.add_argument("--check", action="store_true", help="Only run the chunked == whole-clip check")
+    args = parser.parse_args()
+
+    if not check_streaming_equivalence():
+        print("❌ Streaming path diverges from whole-clip processing, fix that before comparing")
+        sys.exit(1)
+    if args.check:
+        return
+
+    detector = DeepfakeDetector()
+    if detector.streaming_model is None:
+        # Compared here before anyone opts in with USE_STREAMING_MODEL
+        detector.streaming_model = detector._load_streaming_model(STREAMING_MODEL_PATH)
+    if detector.model is None or detector.streaming_model is None:
+        print("❌ Need both models/weights.pth and models/streaming_weights.pth")
+        return
+
+    files = list_files(args.data, args.limit)
+    if not files:
+        print(f"❌ No audio files found in '{args.data}/real' or '{args.data}/fake'")
+        return
+    print(f"📊 Evaluating on {len(files)} clips...")
+
+    labels, resnet_scores, streaming_scores = [], [], []
+    for path, label in files:
+        audio, _ = librosa.load(path, sr=SR, duration=4.0)
+        labels.append(label)
+        resnet_scores.append(serve_clip(detector, audio, streaming=False)[0])
+        streaming_scores.append(serve_clip(detector, audio, streaming=True)[0])
+
+    # Per-hop compute, amortised over a long clip: ResNet re-processes the whole
+    # window every hop, streaming only the new chunk plus a rebuild every 4 s
+    clip = np.random.randn(int(TIMING_SECONDS * SR)).astype(np.float32) * 0.01
+    serve_clip(detector, clip[:int(WINDOW_SECONDS * SR) * 2], streaming=True)  # warm-up
+    _, resnet_times = serve_clip(detector, clip, streaming=False)
+    _, streaming_times = serve_clip(detector, clip, streaming=True)
+    resnet_ms = sum(resnet_times) / len(resnet_times) * 1000
+    streaming_ms = sum(streaming_times) / len(streaming_times) * 1000
+
+    report = {
+        "clips": len(files),
+        "torch_threads": torch.get_num_threads(),
+        "resnet": {
+            "accuracy": accuracy(labels, resnet_scores),
+            "eer": equal_error_rate(labels, resnet_scores),
+            "ms_per_hop": round(resnet_ms, 3),
+        },
+        "streaming": {
+            "accuracy": accuracy(labels, streaming_scores),
+            "eer": equal_error_rate(labels, streaming_scores),
+            "ms_per_hop": round(streaming_ms, 3),
+        },
+        "window_seconds": WINDOW_SECONDS,
+        "hop_seconds": round(CHUNK_SAMPLES / SR, 4),
+    }
+
+    with open(args.out, "w") as f:
+        json.dump(report, f, indent=2)
+    print(json.dumps(report, indent=2))
+    print(f"💾 Saved to {args.out}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,17 @@
+import numpy as np
+from sklearn.metrics import roc_curve
+
+def accuracy(labels, fake_scores, threshold=0.5):
+    """labels: 0 = REAL, 1 = FAKE. fake_scores: P(FAKE) per clip."""
+    labels = np.asarray(labels)
+    preds = (np.asarray(fake_scores) > threshold).astype(int)
+    return float(np.mean(preds == labels)) if len(labels) else 0.0
+
+def equal_error_rate(labels, fake_scores):
+    """EER (the standard ASVspoof metric): point where false accepts == false rejects."""
+    if len(set(labels)) < 2:
+        return float("nan")
+    fpr, tpr, _ = roc_curve(labels, fake_scores, pos_label=1)
+    fnr = 1 - tpr
+    idx = np.nanargmin(np.abs(fnr - fpr))
+    return float((fpr[idx] + fnr[idx]) / 2)
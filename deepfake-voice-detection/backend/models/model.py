@@ -9,9 +9,9 @@ class ResNetDeepFake(nn.Module):
         # 1. Load a pre-trained ResNet18 (trained on ImageNet)
         # We use weights='DEFAULT' or pretrained=True depending on torchvision version
         try:
-            self.resnet = models.resnet18(weights='DEFAULT')
+            self.resnet = models.resnet18(weights='DEFAULT' if pretrained else None)
         except:
-            self.resnet = models.resnet18(pretrained=True)
+            self.resnet = models.resnet18(pretrained=pretrained)
         
         # 2. HACK: Modify the first layer (Input)
         # Standard ResNet expects 3 channels (RGB: Red, Green, Blue).
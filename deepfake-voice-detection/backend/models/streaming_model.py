@@ -0,0 +1,63 @@
+import torch
+import torch.nn as nn
+
+class CausalConvBlock(nn.Module):
+    """
+    Residual 1D conv over time that only looks at past frames.
+    Padding is applied on the left, so output frame t never sees frame t+1.
+    """
+
+    def __init__(self, channels, kernel_size=3, dilation=1):
+        super().__init__()
+        self.context = (kernel_size - 1) * dilation  # Past frames needed per output frame
+        self.conv = nn.Conv1d(channels, channels, kernel_size, dilation=dilation)
+        self.norm = nn.BatchNorm1d(channels)
+        self.act = nn.ReLU()
+
+    def forward(self, x, cache=None):
+        # x: [B, C, T]. cache: the last `context` input frames from the previous call.
+        if cache is None:
+            cache = x.new_zeros(x.shape[0], x.shape[1], self.context)
+        padded = torch.cat([cache, x], dim=2)
+        out = self.act(self.norm(self.conv(padded))) + x
+        return out, padded[:, :, padded.shape[2] - self.context:]
+
+class StreamingDeepFake(nn.Module):
+    """
+    Streaming alternative to ResNetDeepFake.
+    Causal dilated convs over Log-Mel frames + a GRU head. All state lives in
+    (conv caches, GRU hidden), so a live call feeds only the new frames of each
+    hop instead of re-processing the whole window.
+    """
+
+    def __init__(self, n_mels=128, channels=128, hidden_size=128, dilations=(1, 2, 4, 8)):
+        super().__init__()
+        self.input_proj = nn.Conv1d(n_mels, channels, kernel_size=1)
+        self.blocks = nn.ModuleList([CausalConvBlock(channels, 3, d) for d in dilations])
+        self.gru = nn.GRU(channels, hidden_size, batch_first=True)
+        # Same 2 classes as ResNetDeepFake: (0: Real, 1: Fake)
+        self.fc = nn.Linear(hidden_size, 2)
+
+    def forward_step(self, x, state=None):
+        """
+        x: [B, n_mels, new_frames]. state: value returned by the previous call (None to start).
+        Returns (logits [B, 2], new_state).
+        """
+        conv_caches, hidden = state if state is not None else ([None] * len(self.blocks), None)
+
+        out = self.input_proj(x)
+        new_caches = []
+        for block, cache in zip(self.blocks, conv_caches):
+            out, cache = block(out, cache)
+            new_caches.append(cache)
+
+        seq, hidden = self.gru(out.transpose(1, 2), hidden)  # [B, T, H]
+        logits = self.fc(seq[:, -1])
+        return logits, (new_caches, hidden)
+
+    def forward(self, x):
+        # Training / offline path: x is [B, n_mels, T] (or [B, 1, n_mels, T])
+        if x.dim() == 4:
+            x = x.squeeze(1)
+        logits, _ = self.forward_step(x)
+        return logits
@@ -1,5 +1,8 @@
 from typing import Dict, Any
 
+# Risk score (ai_chunks / total_chunks) at which a call flips to "LIKELY AI"
+VERDICT_THRESHOLD = 0.3
+
 class CallStatsManager:
     def __init__(self):
         # In-memory storage: call_id -> stats_dict
@@ -30,12 +33,15 @@ class CallStatsManager:
             
         # Final Verdict Logic as per requirements
         # risk < 0.3 -> Human, risk >= 0.3 -> Likely AI
-        stats["verdict"] = "LIKELY AI" if stats["risk_score"] >= 0.3 else "HUMAN"
+        stats["verdict"] = "LIKELY AI" if stats["risk_score"] >= VERDICT_THRESHOLD else "HUMAN"
         
         return stats
 
     def get_stats(self, call_id: str):
         return self.active_calls.get(call_id, {})
 
+    def end_call(self, call_id: str):
+        return self.active_calls.pop(call_id, {})
+
 # Global instance
 call_stats = CallStatsManager()
@@ -2,67 +2,421 @@ import torch
 import numpy as np
 import os
 import sys
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from models.model import ResNetDeepFake
-from utils.features import extract_log_mel_spectrogram
+from models.streaming_model import StreamingDeepFake
+from utils.features import extract_log_mel_spectrogram, StreamingLogMel
+from utils.serving_profile import load_serving_profile, apply_serving_profile
+from realtime.profiler import profiler
+
+MODELS_DIR = "models"
+DEFAULT_MODEL_PATH = os.path.join(MODELS_DIR, "weights.pth")
+STREAMING_MODEL_PATH = os.path.join(MODELS_DIR, "streaming_weights.pth")
+# Live WebSocket calls only use the streaming model when explicitly enabled,
+# e.g. after evaluation/compare_streaming.py showed it matches the ResNet
+USE_STREAMING_MODEL = os.getenv("USE_STREAMING_MODEL", "").lower() in ("1", "true", "yes")
+# train.py only shows the streaming model 4 s clips from zero state, so a
+# session's state is rebuilt before it has seen more audio than that
+STREAM_STATE_SECONDS = 4.0
+TORCHSCRIPT_EXTENSIONS = (".pt", ".ts", ".torchscript")
+SHADOW_MAX_PENDING = 4  # Drop shadow samples rather than let them pile up
 
 class DeepfakeDetector:
-    def __init__(self):
+    def __init__(self, model_path=DEFAULT_MODEL_PATH):
+        # Host-tuned threads / feature backend (scripts/autotune.py), before any torch work
+        self.serving_profile = apply_serving_profile(load_serving_profile())
+
         self.device = "cuda" if torch.cuda.is_available() else "cpu"
         print(f"🔌 Loading AI Model on {self.device}...")
-        
-        self.model = ResNetDeepFake()
-        model_path = os.path.join("models", "weights.pth")
-        
-        if os.path.exists(model_path):
+
+        self.model_path = model_path
+        self.model_version = 0
+        self.model = self._load_model(model_path)
+        if self.model is not None:
+            self.model_version = 1
+
+        # Hot-swap state (see reload / promote)
+        self.candidate = None
+        self.candidate_path = None
+        self.shadow_rate = 0.0
+        self.shadow_stats = {}
+        self.reload_status = {"state": "idle"}
+        self._reload_lock = threading.Lock()
+        self._shadow_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="shadow")
+        # Free slots for queued shadow batches (acquired on inference threads, released by the shadow thread)
+        self._shadow_slots = threading.Semaphore(SHADOW_MAX_PENDING)
+
+        # Optional streaming variant (trained with MODEL_TYPE=streaming python train.py).
+        # Loaded once at startup: reload / shadow / promote only cover self.model
+        self.streaming_model = self._load_streaming_model(STREAMING_MODEL_PATH) if USE_STREAMING_MODEL else None
+        self._streams = {}  # session_id -> per-session feature carry + model state
+
+    def _load_model(self, model_path):
+        """
+        Loads a state_dict checkpoint (weights.pth) or an exported TorchScript
+        artifact (.pt / .ts). Returns the model in eval mode, or None on failure.
+        """
+        if not os.path.exists(model_path):
+            print(f"⚠️ WARNING: {os.path.basename(model_path)} not found.")
+            return None
+
+        try:
+            if model_path.endswith(TORCHSCRIPT_EXTENSIONS):
+                model = torch.jit.load(model_path, map_location=self.device)
+            else:
+                # Checkpoint overwrites every weight: skip the ImageNet download
+                model = ResNetDeepFake(pretrained=False)
+                model.load_state_dict(torch.load(model_path, map_location=self.device))
+                model.to(self.device)
+            model.eval()
+            print("✅ Model loaded successfully!")
+            return model
+        except Exception as e:
+            print(f"❌ Error loading weights: {e}")
+            return None
+
+    def _load_streaming_model(self, model_path):
+        if not os.path.exists(model_path):
+            return None
+        try:
+            model = StreamingDeepFake()
+            model.load_state_dict(torch.load(model_path, map_location=self.device))
+            model.to(self.device)
+            model.eval()
+            print("✅ Streaming model loaded successfully!")
+            return model
+        except Exception as e:
+            print(f"❌ Error loading streaming weights: {e}")
+            return None
+
+    def _warm_up(self, model, batches=3, batch_size=4):
+        """
+        Runs a few synthetic batches so lazy init (allocator, cuDNN autotune,
+        TorchScript profiling passes) happens before real traffic hits it.
+        Returns the average latency of one batch in seconds.
+        """
+        specs = [extract_log_mel_spectrogram(np.random.randn(64000).astype(np.float32) * 0.01)
+                 for _ in range(batch_size)]
+        batch = torch.stack(specs).to(self.device)
+
+        timings = []
+        with torch.no_grad():
+            for _ in range(batches):
+                start = time.perf_counter()
+                model(batch)
+                timings.append(time.perf_counter() - start)
+        return sum(timings) / len(timings)
+
+    # --- Hot-swap ---
+
+    def reload(self, model_path=DEFAULT_MODEL_PATH, shadow_rate=0.0):
+        """
+        Loads and warms up a new checkpoint in a background thread.
+        shadow_rate == 0: swap it in as soon as it is warm.
+        shadow_rate  > 0: keep it as a candidate scoring that fraction of
+                          live traffic until promote() or discard_candidate().
+        Returns False if another reload is already in progress.
+        """
+        if not self._reload_lock.acquire(blocking=False):
+            return False
+
+        def worker():
+            try:
+                self.reload_status = {"state": "loading", "path": model_path}
+                model = self._load_model(model_path)
+                if model is None:
+                    self.reload_status = {"state": "failed", "path": model_path, "error": "Could not load model"}
+                    return
+
+                self.reload_status = {"state": "warming", "path": model_path}
+                warm_latency = self._warm_up(model)
+
+                if shadow_rate > 0:
+                    self.shadow_stats = {"samples": 0, "agreements": 0, "live_latency": 0.0, "candidate_latency": 0.0}
+                    self.candidate_path = model_path
+                    self.candidate = model
+                    self.shadow_rate = shadow_rate
+                    self.reload_status = {"state": "shadow", "path": model_path, "warm_latency": round(warm_latency, 4)}
+                    print(f"👥 Candidate model in shadow mode ({shadow_rate:.0%} of traffic)")
+                else:
+                    # A direct swap supersedes any shadow candidate, otherwise a
+                    # later promote() would roll back to it
+                    self._clear_candidate()
+                    self._swap(model, model_path)
+                    self.reload_status = {"state": "swapped", "path": model_path, "warm_latency": round(warm_latency, 4)}
+            except Exception as e:
+                print(f"❌ Reload Error: {e}")
+                self.reload_status = {"state": "failed", "path": model_path, "error": str(e)}
+            finally:
+                self._reload_lock.release()
+
+        threading.Thread(target=worker, name="model-reload", daemon=True).start()
+        return True
+
+    def _swap(self, model, model_path):
+        # Single reference assignment: predict() calls already running keep
+        # the old model they grabbed, the next call picks up the new one.
+        self.model = model
+        self.model_path = model_path
+        self.model_version += 1
+        print(f"🔄 Model swapped to {model_path} (version {self.model_version})")
+
+    def promote(self):
+        """Makes the shadow candidate the live model."""
+        candidate = self.candidate
+        if candidate is None:
+            return False
+        candidate_path = self.candidate_path
+        self._clear_candidate()
+        self._swap(candidate, candidate_path)
+        self.reload_status = {"state": "swapped", "path": candidate_path}
+        return True
+
+    def discard_candidate(self):
+        if self.candidate is None:
+            return False
+        self._clear_candidate()
+        self.reload_status = {"state": "idle"}
+        return True
+
+    def _clear_candidate(self):
+        self.shadow_rate = 0.0
+        self.candidate = None
+        self.candidate_path = None
+        self.shadow_stats = {}
+
+    def _maybe_shadow(self, spec_batch, live_scores, live_latency):
+        """Scores a sampled batch on the candidate off the live path."""
+        candidate, stats = self.candidate, self.shadow_stats
+        if candidate is None or random.random() >= self.shadow_rate:
+            return
+        if not self._shadow_slots.acquire(blocking=False):
+            return
+
+        def stale():
+            # Promoted, discarded or replaced while this batch was queued
+            return self.candidate is not candidate or self.shadow_stats is not stats
+
+        def score():
             try:
-                self.model.load_state_dict(torch.load(model_path, map_location=self.device))
-                self.model.to(self.device)
-                self.model.eval()
-                print("✅ Model loaded successfully!")
+                if stale():
+                    return
+                start = time.perf_counter()
+                with torch.no_grad():
+                    probs = torch.nn.functional.softmax(candidate(spec_batch), dim=1)[:, 1].tolist()
+                candidate_latency = time.perf_counter() - start
+
+                if stale():
+                    return
+                for live, cand in zip(live_scores, probs):
+                    stats["samples"] += 1
+                    stats["agreements"] += int((live > 0.5) == (cand > 0.5))
+                stats["live_latency"] += live_latency
+                stats["candidate_latency"] += candidate_latency
             except Exception as e:
-                print(f"❌ Error loading weights: {e}")
-                self.model = None
-        else:
-            print("⚠️ WARNING: weights.pth not found.")
-            self.model = None
+                print(f"Shadow Inference Error: {e}")
+            finally:
+                self._shadow_slots.release()
+
+        self._shadow_executor.submit(score)
+
+    def status(self):
+        status = {
+            "model_path": self.model_path,
+            "model_version": self.model_version,
+            "loaded": self.model is not None,
+            "reload": self.reload_status,
+            # Serves live WebSocket calls when loaded; not hot-swappable
+            "streaming_model": {
+                "enabled": USE_STREAMING_MODEL,
+                "path": STREAMING_MODEL_PATH,
+                "loaded": self.streaming_model is not None,
+                "open_streams": len(self._streams),
+            },
+        }
+        stats = self.shadow_stats
+        if self.candidate is not None and stats.get("samples"):
+            # Latencies are summed over shadowed batches, agreement is per window
+            status["shadow"] = {
+                "rate": self.shadow_rate,
+                "samples": stats["samples"],
+                "agreement": round(stats["agreements"] / stats["samples"], 4),
+                "live_latency_total": round(stats["live_latency"], 4),
+                "candidate_latency_total": round(stats["candidate_latency"], 4),
+                "latency_ratio": round(stats["candidate_latency"] / max(stats["live_latency"], 1e-9), 3),
+            }
+        return status
+
+    # --- Inference ---
 
     def predict(self, audio_buffer):
+        with profiler.window("predict"):
+            return self._predict(audio_buffer)
+
+    def _predict(self, audio_buffer):
         # Default safe response
         result = {
-            "label": "ERROR", 
-            "confidence": 0.0, 
-            "energy": 0.0, 
+            "label": "ERROR",
+            "confidence": 0.0,
+            "energy": 0.0,
             "artifacts": 0.0
         }
 
-        if self.model is None:
+        # Grab the model once so a concurrent swap can't change it mid-request
+        model = self.model
+        if model is None:
             return result
 
         try:
             # 1. Calculate Energy (Volume)
             # Simple Root Mean Square (RMS) calculation
-            energy = float(np.mean(audio_buffer**2)) * 1000 
-            
+            energy = float(np.mean(audio_buffer**2)) * 1000
+
             # 2. AI Inference
-            spec_tensor = extract_log_mel_spectrogram(audio_buffer).unsqueeze(0).to(self.device)
-            
-            with torch.no_grad():
-                logits = self.model(spec_tensor)
+            with profiler.stage("features"):
+                spec_tensor = extract_log_mel_spectrogram(audio_buffer).unsqueeze(0).to(self.device)
+
+            start = time.perf_counter()
+            with profiler.stage("model"), torch.no_grad():
+                logits = model(spec_tensor)
                 probs = torch.nn.functional.softmax(logits, dim=1)
                 fake_score = probs[0][1].item()
-            
+            self._maybe_shadow(spec_tensor, [fake_score], time.perf_counter() - start)
+
             label = "FAKE" if fake_score > 0.5 else "REAL"
-            
+
             return {
                 "label": label,
                 "confidence": float(fake_score),
-                "energy": round(energy, 4),             
-                "artifacts": round(fake_score * 10, 2)  
+                "energy": round(energy, 4),
+                "artifacts": round(fake_score * 10, 2)
             }
-            
+
         except Exception as e:
             print(f"Inference Error: {e}")
-            return result
\ No newline at end of file
+            return result
+
+    def predict_batch(self, audio_buffers):
+        """
+        Runs several equal-length windows through the model in one forward pass.
+        Returns one result dict per window (same shape as predict()).
+        """
+        model = self.model
+        if model is None or len(audio_buffers) == 0:
+            return [self.predict(buf) for buf in audio_buffers]
+
+        try:
+            with profiler.window("predict", count=len(audio_buffers)):
+                with profiler.stage("features"):
+                    specs = [extract_log_mel_spectrogram(buf) for buf in audio_buffers]
+                    batch = torch.stack(specs).to(self.device)
+
+                start = time.perf_counter()
+                with profiler.stage("model"), torch.no_grad():
+                    logits = model(batch)
+                    fake_scores = torch.nn.functional.softmax(logits, dim=1)[:, 1].tolist()
+                self._maybe_shadow(batch, fake_scores, time.perf_counter() - start)
+
+            results = []
+            for buf, fake_score in zip(audio_buffers, fake_scores):
+                energy = float(np.mean(buf**2)) * 1000
+                results.append({
+                    "label": "FAKE" if fake_score > 0.5 else "REAL",
+                    "confidence": float(fake_score),
+                    "energy": round(energy, 4),
+                    "artifacts": round(fake_score * 10, 2)
+                })
+            return results
+
+        except Exception as e:
+            print(f"Batch Inference Error: {e}")
+            return [self.predict(buf) for buf in audio_buffers]
+
+    # --- Streaming API (StreamingDeepFake) ---
+
+    def open_stream(self, session_id):
+        self._streams[session_id] = {
+            "features": StreamingLogMel(), "state": None, "fake_score": None,
+            "fed_samples": 0, "gap": False
+        }
+
+    def _reset_stream(self, stream):
+        stream["features"] = StreamingLogMel()
+        stream["state"] = None
+        stream["fed_samples"] = 0
+        stream["gap"] = False
+
+    def mark_stream_gap(self, session_id):
+        """Call when audio was skipped (deferred / throttled): the next call rebuilds state."""
+        stream = self._streams.get(session_id)
+        if stream is not None:
+            stream["gap"] = True
+
+    def close_stream(self, session_id):
+        self._streams.pop(session_id, None)
+
+    def predict_stream(self, session_id, new_samples, context=None):
+        """
+        Feeds only the audio received since the last call for this session.
+        Compute scales with len(new_samples), not with the window length.
+
+        `context` is the latest full window (ending with new_samples). After a
+        gap, or once the state has seen STREAM_STATE_SECONDS of audio, the
+        state is reset and rebuilt from `context`, so the GRU never runs on
+        broken audio or on sequences longer than it was trained on.
+        Returns the same dict shape as predict().
+        """
+        result = {
+            "label": "ERROR",
+            "confidence": 0.0,
+            "energy": 0.0,
+            "artifacts": 0.0
+        }
+
+        model = self.streaming_model
+        stream = self._streams.get(session_id)
+        if model is None or stream is None:
+            return result
+
+        try:
+            with profiler.window("predict"):
+                energy = float(np.mean(new_samples**2)) * 1000 if len(new_samples) else 0.0
+
+                limit = int(STREAM_STATE_SECONDS * 16000)
+                if stream["gap"] or stream["fed_samples"] + len(new_samples) > limit:
+                    self._reset_stream(stream)
+                    if context is not None:
+                        new_samples = context[-limit:]
+                stream["fed_samples"] += len(new_samples)
+
+                with profiler.stage("features"):
+                    frames = stream["features"].push(new_samples)
+
+                if frames.shape[1] > 0:
+                    with profiler.stage("model"), torch.no_grad():
+                        logits, stream["state"] = model.forward_step(
+                            frames.unsqueeze(0).to(self.device), stream["state"]
+                        )
+                        stream["fake_score"] = torch.nn.functional.softmax(logits, dim=1)[0][1].item()
+
+            fake_score = stream["fake_score"]
+            if fake_score is None:
+                # Not even one full frame yet
+                return dict(result, label="ANALYZING")
+
+            return {
+                "label": "FAKE" if fake_score > 0.5 else "REAL",
+                "confidence": float(fake_score),
+                "energy": round(energy, 4),
+                "artifacts": round(fake_score * 10, 2)
+            }
+
+        except Exception as e:
+            print(f"Streaming Inference Error: {e}")
+            return result
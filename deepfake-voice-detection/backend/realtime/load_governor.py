@@ -0,0 +1,199 @@
+import asyncio
+import collections
+import itertools
+import os
+import time
+
+from realtime.call_stats import VERDICT_THRESHOLD
+
+# Priorities: lower number = served first
+BACKGROUND_PRIORITY = 1.0   # Bulk work (long uploads) always yields to live calls
+
+# Sessions are "confidently decided" once they have enough chunks and their
+# risk score sits far enough from the verdict threshold.
+DECIDED_MIN_CHUNKS = 5
+DECIDED_MARGIN = 0.25
+
+P99_CACHE_SECONDS = 0.1  # hop_multiplier() / should_defer() run on every WebSocket chunk
+
+
+class OverloadedError(Exception):
+    """Raised when the inference queue is past the hard limit."""
+
+    def __init__(self, retry_after=1.0):
+        super().__init__("Inference queue overloaded")
+        self.retry_after = retry_after
+
+
+class LoadGovernor:
+    """
+    Single gate in front of the model. Every inference goes through run(),
+    which queues it by priority, executes it off the event loop and records
+    how long the caller waited for the verdict.
+
+    Only live work (priority below BACKGROUND_PRIORITY) feeds the latency
+    and service-time figures, so a long upload never looks like live load.
+    From those latencies it derives:
+      - level():          NORMAL / DEGRADED / OVERLOADED
+      - hop_multiplier(): how much live sessions should stretch their hop
+      - should_defer():   whether a session is decided enough to skip a window
+    and rejects new work with OverloadedError past the hard limit.
+    """
+
+    NORMAL = "NORMAL"
+    DEGRADED = "DEGRADED"
+    OVERLOADED = "OVERLOADED"
+
+    def __init__(self, target_latency=0.3, hard_limit=1.5, max_hop_multiplier=4.0,
+                 horizon_seconds=10.0, num_workers=1):
+        self.target_latency = target_latency    # p99 we try to hold (seconds)
+        self.hard_limit = hard_limit            # Estimated wait past which we reject
+        self.max_hop_multiplier = max_hop_multiplier
+        self.horizon = horizon_seconds          # Only recent latencies count
+        self.num_workers = num_workers
+
+        self.latencies = collections.deque(maxlen=1000)  # Live only: (finished_at, seconds)
+        self.service_time = 0.05                         # Live EWMA of inference time per window
+        self.background_service_time = 0.05              # Same, for background batches
+        self.rejected = 0
+        self.deferred = 0
+
+        self._queue = None
+        self._live_queued = 0
+        self._p99_cache = (float("-inf"), 0.0)  # (computed_at, value)
+        self._workers = []
+        self._seq = itertools.count()  # Tie-breaker keeps FIFO within a priority
+
+    # --- Measurements ---
+
+    @staticmethod
+    def is_live(priority):
+        return priority < BACKGROUND_PRIORITY
+
+    def p99(self):
+        now = time.monotonic()
+        computed_at, value = self._p99_cache
+        if now - computed_at < P99_CACHE_SECONDS:
+            return value
+        cutoff = now - self.horizon
+        recent = sorted(s for t, s in self.latencies if t >= cutoff)
+        value = recent[min(len(recent) - 1, int(len(recent) * 0.99))] if recent else 0.0
+        self._p99_cache = (now, value)
+        return value
+
+    def queue_depth(self):
+        return self._queue.qsize() if self._queue is not None else 0
+
+    def estimated_wait(self):
+        """
+        Time a new live request would wait: the live work ahead of it plus
+        itself. Queued background batches are served after it, so they don't count.
+        """
+        return (self._live_queued / self.num_workers + 1) * self.service_time
+
+    def level(self):
+        if self.estimated_wait() > self.hard_limit:
+            return self.OVERLOADED
+        if self.p99() > self.target_latency:
+            return self.DEGRADED
+        return self.NORMAL
+
+    # --- Policy ---
+
+    def hop_multiplier(self):
+        """1.0 when healthy, grows with p99 / target up to max_hop_multiplier."""
+        ratio = self.p99() / self.target_latency
+        return min(self.max_hop_multiplier, max(1.0, ratio))
+
+    def priority(self, risk_score, total_chunks=0):
+        """Sessions close to the verdict threshold (or brand new) go first."""
+        if total_chunks == 0:
+            return 0.0
+        return abs(risk_score - VERDICT_THRESHOLD)
+
+    def should_defer(self, risk_score, total_chunks):
+        """Skip a window for an already-decided session while under pressure."""
+        if self.level() == self.NORMAL:
+            return False
+        decided = total_chunks >= DECIDED_MIN_CHUNKS and abs(risk_score - VERDICT_THRESHOLD) >= DECIDED_MARGIN
+        if decided:
+            self.deferred += 1
+        return decided
+
+    def check_admission(self):
+        if self.level() == self.OVERLOADED:
+            self.rejected += 1
+            raise OverloadedError(retry_after=round(self.estimated_wait(), 1))
+
+    # --- Execution ---
+
+    def _ensure_workers(self):
+        if self._queue is None:
+            self._queue = asyncio.PriorityQueue()
+        self._workers = [w for w in self._workers if not w.done()]
+        while len(self._workers) < self.num_workers:
+            self._workers.append(asyncio.create_task(self._worker()))
+
+    async def _worker(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            priority, _, enqueued_at, future, fn, args, windows = await self._queue.get()
+            live = self.is_live(priority)
+            if live:
+                self._live_queued -= 1
+            try:
+                if future.cancelled():
+                    continue  # Caller went away (e.g. WebSocket closed)
+                started = time.monotonic()
+                try:
+                    result = await loop.run_in_executor(None, fn, *args)
+                    if not future.cancelled():
+                        future.set_result(result)
+                except Exception as e:
+                    if not future.cancelled():
+                        future.set_exception(e)
+                finished = time.monotonic()
+                per_window = (finished - started) / max(1, windows)
+                if live:
+                    self.service_time = 0.8 * self.service_time + 0.2 * per_window
+                    self.latencies.append((finished, finished - enqueued_at))
+                else:
+                    self.background_service_time = 0.8 * self.background_service_time + 0.2 * per_window
+            finally:
+                self._queue.task_done()
+
+    async def run(self, fn, *args, priority=0.5, reject=True, windows=1):
+        """
+        Runs fn(*args) on the inference worker and returns its result.
+        With reject=True, raises OverloadedError instead of queueing past the hard limit.
+        Pass windows=len(batch) for batched calls so service time stays per window.
+        """
+        if reject:
+            self.check_admission()
+        self._ensure_workers()
+
+        future = asyncio.get_running_loop().create_future()
+        if self.is_live(priority):
+            self._live_queued += 1
+        await self._queue.put((priority, next(self._seq), time.monotonic(), future, fn, args, windows))
+        return await future
+
+    def status(self):
+        return {
+            "level": self.level(),
+            "p99_latency": round(self.p99(), 4),
+            "service_time": round(self.service_time, 4),
+            "background_service_time": round(self.background_service_time, 4),
+            "queue_depth": self.queue_depth(),
+            "estimated_wait": round(self.estimated_wait(), 4),
+            "hop_multiplier": round(self.hop_multiplier(), 2),
+            "rejected": self.rejected,
+            "deferred": self.deferred,
+        }
+
+
+# Global instance (shared by HTTP and WebSocket paths)
+load_governor = LoadGovernor(
+    target_latency=float(os.getenv("TARGET_P99_LATENCY", "0.3")),
+    hard_limit=float(os.getenv("HARD_LATENCY_LIMIT", "1.5")),
+)
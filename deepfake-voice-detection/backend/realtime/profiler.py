@@ -0,0 +1,353 @@
+import asyncio
+import collections
+import contextlib
+import itertools
+import json
+import os
+import sys
+import threading
+import time
+
+try:
+    import torch
+    import torch.profiler as torch_profiler
+except ImportError:
+    torch = None
+    torch_profiler = None
+
+PROFILES_DIR = "profiles"
+MAX_CAPTURE_SECONDS = 60.0   # An armed capture never outlives this, even with no traffic
+LOOP_PROBE_INTERVAL = 0.01
+
+_NULL_CONTEXT = contextlib.nullcontext()
+
+
+class _Capture:
+    """State of one capture; owned by its sampler thread once armed."""
+
+    def __init__(self, capture_dir, windows, torch_trace):
+        self.dir = capture_dir
+        self.requested = windows
+        self.remaining = windows
+        self.torch_trace = torch_trace
+        self.torch_profiles = []             # One finished torch profile per traced window
+        self.torch_lock = threading.Lock()   # Only one window is torch-traced at a time
+        self.windows = []
+        self.loose_spans = []
+        self.stack_counts = collections.Counter()
+        self.sampler_lag = []
+        self.loop_lag = []
+        self.started_at = time.perf_counter()
+        self.stop_event = threading.Event()
+
+
+class _Stage:
+    __slots__ = ("profiler", "capture", "name", "start")
+
+    def __init__(self, profiler, capture, name):
+        self.profiler = profiler
+        self.capture = capture
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.profiler._record_stage(self.capture, self.name, self.start, time.perf_counter())
+        return False
+
+
+class _Window:
+    __slots__ = ("profiler", "capture", "kind", "count", "record", "torch_prof")
+
+    def __init__(self, profiler, capture, kind, count):
+        self.profiler = profiler
+        self.capture = capture
+        self.kind = kind
+        self.count = count
+
+    def __enter__(self):
+        # torch.profiler hooks the thread that calls start(), so each predict
+        # window starts (and later stops) its own profile on the inference thread
+        self.torch_prof = self.profiler._start_torch(self.capture) if self.kind == "predict" else None
+        self.record = {"kind": self.kind, "windows": self.count, "start": time.perf_counter(), "stages": []}
+        self.profiler._local.window = self.record
+        return self
+
+    def __exit__(self, *exc):
+        end = time.perf_counter()  # Before the torch profiler teardown, which isn't part of the window
+        self.profiler._local.window = None
+        if self.torch_prof is not None:
+            self.profiler._stop_torch(self.capture, self.torch_prof)
+        self.profiler._finish_window(self.capture, self.record, end)
+        return False
+
+
+class PipelineProfiler:
+    """
+    On-demand capture of the next N windows through the inference pipeline.
+
+    Hooks (stage / window) return a shared no-op context manager unless a
+    capture is armed, so leaving them in the hot path costs one attribute check.
+
+    One capture writes to profiles/<timestamp>-<pid>-<n>/:
+      stages.trace.json  per-window stage spans (Chrome trace / Perfetto)
+      torch/window-*.trace.json  torch operator trace per window (Chrome trace / Perfetto)
+      torch_ops.json     torch operators aggregated over all traced windows
+      stacks.folded      sampled Python stacks (flamegraph.pl / speedscope)
+      summary.json       per-window breakdown, stage p50/p99, GIL + event loop lag
+    """
+
+    def __init__(self, output_dir=PROFILES_DIR):
+        self.output_dir = output_dir
+        self.active = False
+        self.last_capture = None
+        self._capture = None
+        self._sampler = None
+        self._capture_ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    # --- Hooks (hot path) ---
+
+    def stage(self, name):
+        if not self.active:
+            return _NULL_CONTEXT
+        return _Stage(self, self._capture, name)
+
+    def window(self, kind="predict", count=1):
+        """Groups the stages of one window; only 'predict' windows count towards N."""
+        if not self.active:
+            return _NULL_CONTEXT
+        return _Window(self, self._capture, kind, count)
+
+    def _record_stage(self, capture, name, start, end):
+        span = {"name": name, "start": start, "end": end, "tid": threading.get_ident()}
+        window = getattr(self._local, "window", None)
+        if window is not None:
+            window["stages"].append(span)
+            return
+        with self._lock:
+            # Once stopped, the sampler thread may already be writing these lists
+            if self._is_current(capture):
+                capture.loose_spans.append(span)
+
+    def _is_current(self, capture):
+        # Call with self._lock held
+        return self.active and capture is self._capture
+
+    def _finish_window(self, capture, record, end):
+        record["end"] = end
+        record["tid"] = threading.get_ident()
+        with self._lock:
+            if not self._is_current(capture):
+                return
+            capture.windows.append(record)
+            if record["kind"] == "predict":
+                capture.remaining -= record["windows"]
+                if capture.remaining <= 0:
+                    self._stop_locked()
+
+    # --- Capture control ---
+
+    def start(self, windows=20, sample_interval=0.005, torch_trace=True):
+        """
+        Arms a capture of the next `windows` predictions. Returns the output
+        folder, or None while a capture is running or still being written.
+        """
+        with self._lock:
+            if self.active or (self._sampler is not None and self._sampler.is_alive()):
+                return None
+
+            capture_dir = os.path.join(
+                self.output_dir, f"{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{next(self._capture_ids)}"
+            )
+            capture = _Capture(capture_dir, windows, torch_trace and torch_profiler is not None)
+            self._capture = capture
+            self._sampler = threading.Thread(
+                target=self._sample_loop, args=(capture, sample_interval), name="profiler-sampler", daemon=True
+            )
+            self.active = True
+            self._sampler.start()
+
+        # Event loop lag probe (only when armed from inside the loop)
+        try:
+            asyncio.get_running_loop().create_task(self._probe_loop(capture))
+        except RuntimeError:
+            pass
+
+        print(f"🔬 Profiling next {windows} windows -> {capture_dir}")
+        return capture_dir
+
+    def stop(self):
+        with self._lock:
+            if self.active:
+                self._stop_locked()
+
+    def _start_torch(self, capture):
+        if not capture.torch_trace or not capture.torch_lock.acquire(blocking=False):
+            return None
+        try:
+            activities = [torch_profiler.ProfilerActivity.CPU]
+            if torch.cuda.is_available():
+                activities.append(torch_profiler.ProfilerActivity.CUDA)
+            prof = torch_profiler.profile(activities=activities, record_shapes=True)
+            prof.start()
+            return prof
+        except Exception as e:
+            print(f"⚠️ Torch profiler unavailable: {e}")
+            capture.torch_trace = False  # Don't retry on every window
+            capture.torch_lock.release()
+            return None
+
+    def _stop_torch(self, capture, prof):
+        # Same thread as _start_torch; exporting is left to the sampler thread
+        try:
+            prof.stop()
+            with self._lock:
+                if self._is_current(capture):
+                    capture.torch_profiles.append(prof)
+        except Exception as e:
+            print(f"⚠️ Torch profiler stop failed: {e}")
+        finally:
+            capture.torch_lock.release()
+
+    def _stop_locked(self):
+        capture = self._capture
+        self.active = False
+        # The sampler thread notices, then writes everything off the hot path
+        capture.stop_event.set()
+
+    async def _probe_loop(self, capture):
+        while not capture.stop_event.is_set():
+            start = time.perf_counter()
+            await asyncio.sleep(LOOP_PROBE_INTERVAL)
+            capture.loop_lag.append(time.perf_counter() - start - LOOP_PROBE_INTERVAL)
+
+    def _sample_loop(self, capture, interval):
+        own_id = threading.get_ident()
+        names = {t.ident: t.name for t in threading.enumerate()}
+
+        expected = time.perf_counter() + interval
+        while not capture.stop_event.wait(interval):
+            before = time.perf_counter()
+            frames = sys._current_frames()
+            # How late we woke up ~= how long we waited for the GIL
+            capture.sampler_lag.append(max(0.0, before - expected))
+
+            for tid, frame in frames.items():
+                if tid == own_id:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                    frame = frame.f_back
+                if tid not in names:
+                    names = {t.ident: t.name for t in threading.enumerate()}
+                stack.append(names.get(tid, str(tid)))
+                capture.stack_counts[";".join(reversed(stack))] += 1
+
+            if before - capture.started_at > MAX_CAPTURE_SECONDS:
+                self.stop()
+            expected = time.perf_counter() + interval
+
+        self._write_capture(capture)
+
+    # --- Output ---
+
+    def _write_capture(self, capture):
+        os.makedirs(capture.dir, exist_ok=True)
+        pid = os.getpid()
+        t0 = capture.started_at
+
+        def us(t):
+            return round((t - t0) * 1e6, 1)
+
+        # 1. Stage spans as Chrome trace events
+        events = []
+        for i, window in enumerate(capture.windows):
+            events.append({"name": f"{window['kind']} #{i}", "ph": "X", "pid": pid, "tid": window["tid"],
+                           "ts": us(window["start"]), "dur": us(window["end"]) - us(window["start"])})
+            for span in window["stages"]:
+                events.append({"name": span["name"], "ph": "X", "pid": pid, "tid": span["tid"],
+                               "ts": us(span["start"]), "dur": us(span["end"]) - us(span["start"])})
+        for span in capture.loose_spans:
+            events.append({"name": span["name"], "ph": "X", "pid": pid, "tid": span["tid"],
+                           "ts": us(span["start"]), "dur": us(span["end"]) - us(span["start"])})
+        with open(os.path.join(capture.dir, "stages.trace.json"), "w") as f:
+            json.dump({"traceEvents": events}, f)
+
+        # 2. Torch operators: one trace per window + an aggregate table
+        ops = collections.defaultdict(lambda: {"count": 0, "cpu_time_total_us": 0.0})
+        if capture.torch_profiles:
+            os.makedirs(os.path.join(capture.dir, "torch"), exist_ok=True)
+        for i, prof in enumerate(capture.torch_profiles):
+            try:
+                prof.export_chrome_trace(os.path.join(capture.dir, "torch", f"window-{i:03d}.trace.json"))
+                for evt in prof.key_averages():
+                    ops[evt.key]["count"] += evt.count
+                    ops[evt.key]["cpu_time_total_us"] += evt.cpu_time_total
+            except Exception as e:
+                print(f"⚠️ Torch trace export failed: {e}")
+        if ops:
+            top = sorted(ops.items(), key=lambda kv: kv[1]["cpu_time_total_us"], reverse=True)
+            with open(os.path.join(capture.dir, "torch_ops.json"), "w") as f:
+                json.dump([dict(op=name, **stats) for name, stats in top], f, indent=2)
+
+        # 3. Python stacks in collapsed/folded format
+        with open(os.path.join(capture.dir, "stacks.folded"), "w") as f:
+            for stack, count in capture.stack_counts.most_common():
+                f.write(f"{stack} {count}\n")
+
+        # 4. Per-window breakdown + aggregates
+        per_stage = collections.defaultdict(list)
+        breakdown = []
+        for window in capture.windows:
+            stages = collections.defaultdict(float)
+            for span in window["stages"]:
+                stages[span["name"]] += span["end"] - span["start"]
+            for name, seconds in stages.items():
+                per_stage[name].append(seconds)
+            breakdown.append({
+                "kind": window["kind"],
+                "windows": window["windows"],
+                "total_ms": round((window["end"] - window["start"]) * 1000, 3),
+                "stages_ms": {k: round(v * 1000, 3) for k, v in stages.items()},
+            })
+        for span in capture.loose_spans:
+            per_stage[span["name"]].append(span["end"] - span["start"])
+
+        summary = {
+            "windows_requested": capture.requested,
+            "windows_captured": sum(w["windows"] for w in capture.windows if w["kind"] == "predict"),
+            "duration_s": round(time.perf_counter() - t0, 3),
+            "stages_ms": {name: _percentiles(values) for name, values in per_stage.items()},
+            "gil_wait_ms": _percentiles(capture.sampler_lag),
+            "event_loop_lag_ms": _percentiles(capture.loop_lag),
+            "python_samples": sum(capture.stack_counts.values()),
+            "windows": breakdown,
+        }
+        with open(os.path.join(capture.dir, "summary.json"), "w") as f:
+            json.dump(summary, f, indent=2)
+
+        self.last_capture = {"path": capture.dir, "windows_captured": summary["windows_captured"]}
+        print(f"✅ Profile written to {capture.dir}")
+
+    def status(self):
+        writing = self._sampler is not None and self._sampler.is_alive() and not self.active
+        return {"active": self.active, "writing": writing, "last_capture": self.last_capture}
+
+
+def _percentiles(values):
+    if not values:
+        return {}
+    ordered = sorted(values)
+    pick = lambda q: ordered[min(len(ordered) - 1, int(len(ordered) * q))]
+    return {"count": len(ordered), "p50": round(pick(0.5) * 1000, 3),
+            "p99": round(pick(0.99) * 1000, 3), "max": round(ordered[-1] * 1000, 3)}
+
+
+# Global instance
+profiler = PipelineProfiler()
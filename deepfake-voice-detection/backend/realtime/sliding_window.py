@@ -5,6 +5,7 @@ class SlidingWindowBuffer:
     def __init__(self, window_size_seconds=4.0, sr=16000):
         self.window_size = int(window_size_seconds * sr)
         self.buffer = collections.deque(maxlen=self.window_size)
+        self.new_samples = 0  # Samples added since the last get_buffer()
         
     def add_chunk(self, chunk_bytes):
         """
@@ -14,6 +15,7 @@ class SlidingWindowBuffer:
         new_data = np.frombuffer(chunk_bytes, dtype=np.float32)
         
         self.buffer.extend(new_data)
+        self.new_samples += len(new_data)
         
     def is_ready(self):
         """Returns True if buffer is full enough to predict."""
@@ -21,4 +23,5 @@ class SlidingWindowBuffer:
 
     def get_buffer(self):
         """Returns the current numpy array for the model."""
+        self.new_samples = 0
         return np.array(self.buffer, dtype=np.float32)
\ No newline at end of file
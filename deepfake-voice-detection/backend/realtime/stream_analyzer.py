@@ -0,0 +1,232 @@
+import asyncio
+import json
+import numpy as np
+
+from realtime.load_governor import BACKGROUND_PRIORITY
+
+SAMPLE_RATE = 16000
+STREAM_BATCH_SIZE = 8         # Windows per forward pass
+DECODE_READ_SIZE = 64 * 1024  # Bytes pulled from ffmpeg per read (16k float32 samples)
+STDERR_TAIL_BYTES = 4096      # Last bit of ffmpeg's log kept for the error message
+MAX_WINDOW_SECONDS = 4.0      # extract_log_mel_spectrogram pads/cuts every window to 4 s
+MIN_HOP_SECONDS = 0.1         # Smaller hops just multiply work on overlapping audio
+
+
+class StreamWindower:
+    """
+    Cuts an incoming stream of samples into fixed-size windows with a hop.
+    Only the samples still needed for the next window are kept in memory,
+    so a 1-hour recording costs the same RAM as a 4-second one.
+    """
+
+    def __init__(self, window_size_seconds=4.0, hop_seconds=2.0, sr=SAMPLE_RATE):
+        self.sr = sr
+        self.window_size = int(window_size_seconds * sr)
+        self.hop_size = int(hop_seconds * sr)
+        # A zero-sample window or hop would never shrink the buffer below
+        if self.window_size < 1 or self.hop_size < 1 or self.hop_size > self.window_size:
+            raise ValueError("Need 1 <= hop_size <= window_size samples")
+        self.buffer = np.zeros(0, dtype=np.float32)
+        self.buffer_start = 0       # Absolute sample index of buffer[0]
+        self.total_samples = 0
+        self.last_window_end = 0    # Absolute sample index covered so far
+
+    def add_samples(self, samples):
+        """Returns a list of (start_sample, window) that became complete."""
+        self.buffer = np.concatenate([self.buffer, samples])
+        self.total_samples += len(samples)
+
+        windows = []
+        while len(self.buffer) >= self.window_size:
+            windows.append((self.buffer_start, self.buffer[:self.window_size].copy()))
+            self.last_window_end = self.buffer_start + self.window_size
+            self.buffer = self.buffer[self.hop_size:]
+            self.buffer_start += self.hop_size
+        return windows
+
+    def flush(self):
+        """Emits the trailing partial window if some audio was never analyzed."""
+        if self.total_samples > self.last_window_end and len(self.buffer) > 0:
+            self.last_window_end = self.total_samples
+            return [(self.buffer_start, self.buffer.copy())]
+        return []
+
+
+class TimelineAggregator:
+    """
+    Keeps the running verdict and a time-aligned timeline of every window.
+    Segment fields match what the frontend DetectionTimeline renders.
+    """
+
+    def __init__(self, sr=SAMPLE_RATE):
+        self.sr = sr
+        self.segments = []
+        self.fake_windows = 0
+        self.score_sum = 0.0
+
+    def add(self, start_sample, num_samples, result):
+        fake_score = float(result.get("confidence", 0.0))
+        label = result.get("label", "ERROR")
+
+        if label != "ERROR":
+            self.score_sum += fake_score
+            if label == "FAKE":
+                self.fake_windows += 1
+
+        # UI confidence = how sure we are about the shown label (in %)
+        label_conf = fake_score if label == "FAKE" else 1.0 - fake_score
+        segment = {
+            "id": len(self.segments),
+            "start": round(start_sample / self.sr, 3),
+            "end": round((start_sample + num_samples) / self.sr, 3),
+            "status": label.lower(),
+            "label": label,
+            "confidence": round(label_conf * 100, 1) if label != "ERROR" else 0.0,
+            "fake_score": round(fake_score, 4),
+            "energy": result.get("energy", 0.0),
+        }
+        self.segments.append(segment)
+        return segment
+
+    def summary(self):
+        analyzed = sum(1 for s in self.segments if s["label"] != "ERROR")
+        if analyzed == 0:
+            return {"windows": len(self.segments), "label": "INCONCLUSIVE", "confidence": 0.0, "risk_score": 0.0}
+
+        # Same majority logic as the WebSocket final verdict
+        risk = self.fake_windows / analyzed
+        label = "FAKE" if risk > 0.5 else "REAL"
+        conf = risk if label == "FAKE" else (1.0 - risk)
+        return {
+            "windows": len(self.segments),
+            "fake_windows": self.fake_windows,
+            "risk_score": round(risk, 4),
+            "mean_fake_score": round(self.score_sum / analyzed, 4),
+            "label": label,
+            "confidence": round(float(conf), 2),
+        }
+
+
+async def decode_stream(byte_chunks, sr=SAMPLE_RATE):
+    """
+    Pipes an async iterator of encoded audio bytes (wav/flac/mp3/webm/ogg...)
+    through ffmpeg and yields mono float32 numpy arrays at `sr`.
+    Pipe back-pressure keeps memory bounded: if we stop reading, ffmpeg stops
+    writing, and the feeder stops pulling the request body.
+    """
+    proc = await asyncio.create_subprocess_exec(
+        "ffmpeg", "-hide_banner", "-loglevel", "error",
+        "-i", "pipe:0",
+        "-f", "f32le", "-ac", "1", "-ar", str(sr), "pipe:1",
+        stdin=asyncio.subprocess.PIPE,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE,
+    )
+
+    async def feed():
+        try:
+            async for chunk in byte_chunks:
+                if chunk:
+                    proc.stdin.write(chunk)
+                    await proc.stdin.drain()
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # ffmpeg gave up on the input; the error surfaces via returncode
+        finally:
+            try:
+                proc.stdin.close()
+            except Exception:
+                pass
+
+    stderr_tail = bytearray()
+
+    async def drain_stderr():
+        # Read continuously so a chatty corrupt upload can't fill the pipe and stall ffmpeg
+        while True:
+            line = await proc.stderr.read(4096)
+            if not line:
+                break
+            stderr_tail.extend(line)
+            del stderr_tail[:-STDERR_TAIL_BYTES]
+
+    feeder = asyncio.create_task(feed())
+    drainer = asyncio.create_task(drain_stderr())
+    leftover = b""
+    try:
+        while True:
+            data = await proc.stdout.read(DECODE_READ_SIZE)
+            if not data:
+                break
+            data = leftover + data
+            usable = len(data) - (len(data) % 4)  # float32 = 4 bytes
+            leftover = data[usable:]
+            if usable:
+                yield np.frombuffer(data[:usable], dtype=np.float32)
+
+        await feeder
+        await drainer
+        if await proc.wait() != 0:
+            raise RuntimeError(f"ffmpeg could not decode stream: {stderr_tail.decode(errors='ignore').strip()}")
+    finally:
+        for task in (feeder, drainer):
+            if not task.done():
+                task.cancel()
+        if proc.returncode is None:
+            proc.kill()
+            await proc.wait()
+
+
+async def analyze_stream(byte_chunks, detector, window_size_seconds=4.0, hop_seconds=2.0,
+                         batch_size=STREAM_BATCH_SIZE, sr=SAMPLE_RATE, governor=None):
+    """
+    Async generator of progress events for a streamed recording:
+      {"type": "window", "segment": {...}, "summary": {...}}   (one per window)
+      {"type": "complete", "summary": {...}, "timeline": [...]}
+      {"type": "error", "detail": "..."}                        (decode failure)
+    Pass the LoadGovernor as `governor` to queue batches at background priority.
+    """
+    loop = asyncio.get_running_loop()
+    windower = StreamWindower(window_size_seconds, hop_seconds, sr)
+    timeline = TimelineAggregator(sr)
+    pending = []
+
+    async def run_batch(batch):
+        # Inference runs off the event loop so other requests keep flowing.
+        # With a governor, an admitted upload is never rejected mid-way, it
+        # just queues behind live calls.
+        windows = [w for _, w in batch]
+        if governor is not None:
+            results = await governor.run(detector.predict_batch, windows, priority=BACKGROUND_PRIORITY,
+                                         reject=False, windows=len(windows))
+        else:
+            results = await loop.run_in_executor(None, detector.predict_batch, windows)
+        events = []
+        for (start, window), result in zip(batch, results):
+            segment = timeline.add(start, len(window), result)
+            events.append({"type": "window", "segment": segment, "summary": timeline.summary()})
+        return events
+
+    try:
+        async for samples in decode_stream(byte_chunks, sr):
+            pending.extend(windower.add_samples(samples))
+            while len(pending) >= batch_size:
+                batch, pending = pending[:batch_size], pending[batch_size:]
+                for event in await run_batch(batch):
+                    yield event
+    except RuntimeError as e:
+        print(f"Stream Decode Error: {e}")
+        yield {"type": "error", "detail": str(e)}
+
+    pending.extend(windower.flush())
+    if pending:
+        for event in await run_batch(pending):
+            yield event
+
+    yield {"type": "complete", "summary": timeline.summary(), "timeline": timeline.segments}
+
+
+def format_event(event, fmt="ndjson"):
+    """Serializes one event as an NDJSON line or a Server-Sent Event."""
+    payload = json.dumps(event)
+    if fmt == "sse":
+        return f"event: {event['type']}\ndata: {payload}\n\n"
+    return payload + "\n"
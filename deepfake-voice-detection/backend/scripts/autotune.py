@@ -0,0 +1,203 @@
+"""
+Per-node serving autotuner.
+
+Sweeps torch intra-op threads, micro-batch size, (opt-in) uvicorn worker count
+and feature backend against a synthetic ResNetDeepFake + Log-Mel workload on
+this machine, then writes the best settings to serving_profile.json, which
+DeepfakeDetector applies at startup.
+
+Usage (from backend/):
+    python scripts/autotune.py                 # ~2-4 min
+    python scripts/autotune.py --duration 2    # faster, noisier
+    python scripts/autotune.py --multi-worker  # also try several uvicorn workers
+
+Only 1 worker is tuned by default: call_stats (per-call risk for
+/analyze-chunk?call_id), the LoadGovernor, model hot-swap and /admin/profile
+all live in one process. With more workers, one call's chunks are scored by
+different processes and admin actions only reach whichever worker got them.
+
+The search is staged (coordinate descent) instead of a full grid:
+  1. workers x intra-op threads   (workers fixed at 1 without --multi-worker;
+                                   never more threads than cores in total)
+  2. batch size on the best layout
+  3. feature backend on the best of the above
+Inter-op threads are pinned to 1 rather than swept: eager ResNet inference
+never uses the inter-op pool, so that dimension would only measure noise.
+"""
+import argparse
+import json
+import multiprocessing as mp
+import os
+import platform
+import queue
+import sys
+import time
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+SR = 16000
+WINDOW_SECONDS = 2.5  # Same window as the live WebSocket path
+STARTUP_TIMEOUT = 120.0  # Seconds a worker may take to import torch + build the model
+
+def _worker(settings, duration, barrier, results):
+    # Runs in a fresh process so torch thread settings apply cleanly
+    import torch
+    torch.set_num_threads(settings["intra_op_threads"])
+    torch.set_num_interop_threads(settings["inter_op_threads"])
+
+    from models.model import ResNetDeepFake
+    from utils.features import extract_log_mel_spectrogram, set_feature_backend
+
+    backend = set_feature_backend(settings["feature_backend"])
+    model = ResNetDeepFake(pretrained=False).eval()
+    rng = np.random.default_rng(0)
+    windows = [rng.standard_normal(int(WINDOW_SECONDS * SR)).astype(np.float32) * 0.05
+               for _ in range(settings["batch_size"])]
+
+    def step():
+        specs = [extract_log_mel_spectrogram(w) for w in windows]
+        with torch.no_grad():
+            model(torch.stack(specs))
+
+    for _ in range(2):  # Warm-up
+        step()
+
+    barrier.wait()  # All workers measure the same contended period
+    latencies = []
+    start = time.perf_counter()
+    while time.perf_counter() - start < duration:
+        t = time.perf_counter()
+        step()
+        # Every window in a batch waits for the whole batch
+        latencies.append(time.perf_counter() - t)
+
+    results.put({
+        "latencies": latencies,
+        "windows": len(latencies) * settings["batch_size"],
+        "elapsed": time.perf_counter() - start,
+        "feature_backend": backend,
+    })
+
+def measure(settings, duration):
+    ctx = mp.get_context("spawn")
+    barrier = ctx.Barrier(settings["workers"], timeout=STARTUP_TIMEOUT)
+    results = ctx.Queue()
+    procs = [ctx.Process(target=_worker, args=(settings, duration, barrier, results))
+             for _ in range(settings["workers"])]
+    for p in procs:
+        p.start()
+
+    # A crashed worker (OOM, import error) never reports back: don't wait forever
+    runs = []
+    deadline = time.monotonic() + STARTUP_TIMEOUT + duration
+    while len(runs) < len(procs):
+        try:
+            runs.append(results.get(timeout=1.0))
+        except queue.Empty:
+            crashed = [p.exitcode for p in procs if p.exitcode not in (None, 0)]
+            if crashed or time.monotonic() > deadline:
+                break
+    for p in procs:
+        p.join(timeout=5)
+        if p.is_alive():
+            p.terminate()
+
+    if len(runs) < len(procs):
+        print(f"   ❌ {settings} failed (worker exit codes: {[p.exitcode for p in procs]})")
+        return dict(settings, throughput=0.0, p99_ms=None, failed=True)
+
+    latencies = sorted(l for r in runs for l in r["latencies"])
+    elapsed = max(r["elapsed"] for r in runs)
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] if latencies else float("inf")
+    result = dict(settings,
+                  feature_backend=runs[0]["feature_backend"],
+                  throughput=round(sum(r["windows"] for r in runs) / elapsed, 2),
+                  p99_ms=round(p99 * 1000, 2))
+    print(f"   {result}")
+    return result
+
+def best(results, p99_budget_ms):
+    """Highest throughput within the latency budget, else the lowest p99 (None if all failed)."""
+    results = [r for r in results if not r.get("failed")]
+    if not results:
+        return None
+    within = [r for r in results if r["p99_ms"] <= p99_budget_ms]
+    if within:
+        return max(within, key=lambda r: r["throughput"])
+    return min(results, key=lambda r: r["p99_ms"])
+
+def autotune(duration, p99_budget_ms, batch_sizes, output, multi_worker=False):
+    cores = os.cpu_count() or 1
+    steps = sorted({n for n in (1, 2, 4, 8, 16, cores) if n <= cores})
+    worker_steps = steps if multi_worker else [1]
+    backends = ["librosa"]
+    try:
+        import torchaudio  # noqa: F401
+        backends.append("torchaudio")
+    except ImportError:
+        print("⚠️ torchaudio not installed, only tuning librosa features")
+
+    print(f"🔧 Autotuning on {cores} cores (p99 budget {p99_budget_ms} ms, {duration}s per config)")
+    results = []
+    base = {"intra_op_threads": 1, "inter_op_threads": 1, "batch_size": 1,
+            "workers": 1, "feature_backend": "librosa"}
+
+    print("1️⃣  Worker layout")
+    stage = [measure(dict(base, workers=w, intra_op_threads=t), duration)
+             for w in worker_steps for t in steps if w * t <= cores]
+    results += stage
+    layout = best(stage, p99_budget_ms)
+    if layout is None:
+        print("❌ Every configuration failed, check that torch and the models import cleanly")
+        return
+    base.update({k: layout[k] for k in ("workers", "intra_op_threads")})
+
+    print("2️⃣  Batch size")
+    stage = [measure(dict(base, batch_size=b), duration) for b in batch_sizes]
+    results += stage
+    base["batch_size"] = (best(stage, p99_budget_ms) or base)["batch_size"]
+
+    print("3️⃣  Feature backend")
+    stage = [measure(dict(base, feature_backend=fb), duration) for fb in backends]
+    results += stage
+    winner = best(stage, p99_budget_ms) or best(results, p99_budget_ms)
+
+    settings = {k: winner[k] for k in ("intra_op_threads", "inter_op_threads", "batch_size",
+                                       "workers", "feature_backend")}
+    profile = {
+        "host": {"cpu_count": cores, "platform": platform.platform(), "python": platform.python_version()},
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "p99_budget_ms": p99_budget_ms,
+        "settings": settings,
+        "expected": {"throughput": winner["throughput"], "p99_ms": winner["p99_ms"]},
+        "measurements": results,
+    }
+    with open(output, "w") as f:
+        json.dump(profile, f, indent=2)
+
+    print(f"✅ Best: {settings} -> {winner['throughput']} windows/s, p99 {winner['p99_ms']} ms")
+    print(f"💾 Serving profile saved to {output}")
+    if settings["workers"] > 1:
+        # uvicorn reads its default --workers from WEB_CONCURRENCY
+        print(f"👉 Start the API with: WEB_CONCURRENCY={settings['workers']} uvicorn api.app:app --port 8000")
+        print("⚠️ Each worker keeps its own call stats, load governor, model and profiler: "
+              "/analyze-chunk?call_id risk scores split across workers and /admin/* only reaches one")
+    else:
+        print("👉 Start the API with: uvicorn api.app:app --port 8000")
+
+if __name__ == "__main__":
+    from utils.serving_profile import SERVING_PROFILE_PATH
+
+    parser = argparse.ArgumentParser(description="Tune serving settings for this machine")
+    parser.add_argument("--duration", type=float, default=4.0, help="Seconds measured per config")
+    parser.add_argument("--p99-budget-ms", type=float, default=300.0,
+                        help="Latency budget (matches TARGET_P99_LATENCY by default)")
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--output", default=SERVING_PROFILE_PATH)
+    parser.add_argument("--multi-worker", action="store_true",
+                        help="Also sweep uvicorn worker counts (state is per process, see above)")
+    args = parser.parse_args()
+
+    autotune(args.duration, args.p99_budget_ms, args.batch_sizes, args.output, args.multi_worker)
@@ -5,13 +5,15 @@ from torch.utils.data import Dataset, DataLoader
 import os
 import glob
 import sys
+import numpy as np
 
 # Ensure we can import from local folders
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 try:
-    from utils.features import extract_log_mel_spectrogram
+    from utils.features import extract_log_mel_spectrogram, extract_log_mel_frames
     from models.model import ResNetDeepFake
+    from models.streaming_model import StreamingDeepFake
 except ImportError:
     print("❌ Critical Error: Could not import 'utils' or 'models'.")
     print("Make sure you have created 'backend/utils/features.py' and 'backend/models/model.py'")
@@ -23,12 +25,15 @@ BATCH_SIZE = 16       # Reduce to 8 if you run out of Memory
 EPOCHS = 5            # 5 Epochs is usually enough f    or a Hackathon demo
 LR = 0.001            # Learning Rate
 DEVICE = "cuda" if torch.cuda.is_available() else "cpu"
+# "resnet" (default, 2D spectrogram image) or "streaming" (causal conv + GRU, see models/streaming_model.py)
+MODEL_TYPE = os.getenv("MODEL_TYPE", "resnet")
 
-print(f"⚙️  Training Configuration: Device={DEVICE}, Batch={BATCH_SIZE}, Epochs={EPOCHS}")
+print(f"⚙️  Training Configuration: Model={MODEL_TYPE}, Device={DEVICE}, Batch={BATCH_SIZE}, Epochs={EPOCHS}")
 
 # --- DATASET LOADER ---
 class VoiceDataset(Dataset):
-    def __init__(self, root_dir):
+    def __init__(self, root_dir, feature_fn=extract_log_mel_spectrogram):
+        self.feature_fn = feature_fn
         # Allow both .wav (if you recorded your own) and .flac (ASVspoof dataset)
         self.real_files = glob.glob(os.path.join(root_dir, "real", "*"))
         self.fake_files = glob.glob(os.path.join(root_dir, "fake", "*"))
@@ -52,13 +57,13 @@ class VoiceDataset(Dataset):
         
         try:
             # Extract Feature (Log-Mel Spectrogram)
-            # Returns Tensor of shape [1, Freq, Time]
-            spec = extract_log_mel_spectrogram(file_path)
+            # Returns Tensor of shape [1, Freq, Time] (resnet) or [Freq, Time] (streaming)
+            spec = self.feature_fn(file_path)
             return spec, torch.tensor(label, dtype=torch.long)
         except Exception as e:
             print(f"⚠️ Error loading {file_path}: {e}")
             # Return a dummy tensor to prevent crashing (Hackathon fix)
-            return torch.zeros((1, 128, 128)), torch.tensor(label, dtype=torch.long)
+            return torch.zeros_like(self.feature_fn(np.zeros(1, dtype=np.float32))), torch.tensor(label, dtype=torch.long)
 
 # --- TRAINING LOOP ---
 def train():
@@ -68,7 +73,12 @@ def train():
         print("👉 Run 'python backend/data/loader.py' first.")
         return
 
-    dataset = VoiceDataset(DATA_DIR)
+    if MODEL_TYPE == "streaming":
+        feature_fn, save_name = extract_log_mel_frames, "streaming_weights.pth"
+    else:
+        feature_fn, save_name = extract_log_mel_spectrogram, "weights.pth"
+
+    dataset = VoiceDataset(DATA_DIR, feature_fn)
     if len(dataset) == 0:
         print("❌ Error: No audio files found in 'data/'")
         return
@@ -76,8 +86,12 @@ def train():
     dataloader = DataLoader(dataset, batch_size=BATCH_SIZE, shuffle=True)
     
     # 2. Initialize Model
-    print("🧠 Initializing ResNet18 (Customized for Audio)...")
-    model = ResNetDeepFake().to(DEVICE)
+    if MODEL_TYPE == "streaming":
+        print("🧠 Initializing Streaming Causal-Conv + GRU model...")
+        model = StreamingDeepFake().to(DEVICE)
+    else:
+        print("🧠 Initializing ResNet18 (Customized for Audio)...")
+        model = ResNetDeepFake().to(DEVICE)
     
     # 3. Setup Optimizer
     criterion = nn.CrossEntropyLoss()
@@ -118,7 +132,7 @@ def train():
         print(f"✅ Epoch {epoch+1}/{EPOCHS} Finished | Accuracy: {epoch_acc:.2f}% | Loss: {epoch_loss:.4f}")
         
         # Save Checkpoint
-        save_path = os.path.join("models", "weights.pth")
+        save_path = os.path.join("models", save_name)
         torch.save(model.state_dict(), save_path)
         print(f"💾 Model saved to {save_path}")
 
@@ -2,6 +2,46 @@ import librosa
 import numpy as np
 import torch
 
+# --- Feature backend ---
+# "librosa" (default) or "torchaudio": same Mel filterbank and dB math, but
+# torchaudio runs as torch ops on torch's thread pool. Picked per host by
+# scripts/autotune.py and applied at startup from the serving profile.
+FEATURE_BACKENDS = ("librosa", "torchaudio")
+_feature_backend = "librosa"
+_torchaudio_mels = {}  # sr -> MelSpectrogram transform
+
+def set_feature_backend(name):
+    """Switches the backend used for live arrays. Returns the backend actually in use."""
+    global _feature_backend
+    if name not in FEATURE_BACKENDS:
+        raise ValueError(f"Unknown feature backend '{name}', expected one of {FEATURE_BACKENDS}")
+    if name == "torchaudio":
+        try:
+            import torchaudio  # noqa: F401
+        except ImportError:
+            print("⚠️ torchaudio not installed, keeping librosa features")
+            return _feature_backend
+    _feature_backend = name
+    return _feature_backend
+
+def get_feature_backend():
+    return _feature_backend
+
+def _torchaudio_log_mel(y, sr):
+    if sr not in _torchaudio_mels:
+        import torchaudio
+        # Matches librosa.feature.melspectrogram defaults (slaney mel, centered, zero padded)
+        _torchaudio_mels[sr] = torchaudio.transforms.MelSpectrogram(
+            sample_rate=sr, n_fft=1024, hop_length=256, n_mels=128,
+            norm="slaney", mel_scale="slaney", pad_mode="constant", power=2.0
+        )
+    with torch.no_grad():
+        mel_spec = _torchaudio_mels[sr](torch.from_numpy(np.ascontiguousarray(y, dtype=np.float32)))
+        # Same as librosa.power_to_db(ref=np.max) with top_db=80
+        log_mel = 10.0 * torch.log10(torch.clamp(mel_spec, min=1e-10))
+        log_mel = torch.clamp(log_mel - log_mel.max(), min=-80.0)
+    return log_mel.numpy()
+
 def extract_log_mel_spectrogram(audio_path_or_array, sr=16000, duration=4.0):
     """
     Converts audio to a Log-Mel Spectrogram image tensor.
@@ -27,14 +67,18 @@ def extract_log_mel_spectrogram(audio_path_or_array, sr=16000, duration=4.0):
     else:
         y = y[:target_len]
 
-    # 3. Extract Mel Spectrogram
-    # n_mels=128 is the height of the image
-    mel_spec = librosa.feature.melspectrogram(
-        y=y, sr=sr, n_mels=128, n_fft=1024, hop_length=256
-    )
-    
-    # 4. Convert to Log Scale (dB)
-    log_mel = librosa.power_to_db(mel_spec, ref=np.max)
+    if _feature_backend == "torchaudio":
+        # 3 + 4. Mel Spectrogram in dB, computed with torch ops
+        log_mel = _torchaudio_log_mel(y, sr)
+    else:
+        # 3. Extract Mel Spectrogram
+        # n_mels=128 is the height of the image
+        mel_spec = librosa.feature.melspectrogram(
+            y=y, sr=sr, n_mels=128, n_fft=1024, hop_length=256
+        )
+
+        # 4. Convert to Log Scale (dB)
+        log_mel = librosa.power_to_db(mel_spec, ref=np.max)
     
     # 5. Normalize (Crucial for Neural Nets to converge fast)
     mean = np.mean(log_mel)
@@ -43,4 +87,68 @@ def extract_log_mel_spectrogram(audio_path_or_array, sr=16000, duration=4.0):
     
     # 6. Convert to Tensor [1, H, W]
     # We add the '1' channel dimension because CNNs expect (Channel, Height, Width)
-    return torch.tensor(log_mel, dtype=torch.float32).unsqueeze(0)
\ No newline at end of file
+    return torch.tensor(log_mel, dtype=torch.float32).unsqueeze(0)
+
+# --- Streaming features (used by StreamingDeepFake) ---
+# center=False + per-frame normalization means every frame depends only on its
+# own n_fft samples, so computing frames chunk-by-chunk gives exactly the same
+# result as computing them on the whole clip.
+N_MELS = 128
+N_FFT = 1024
+HOP_LENGTH = 256
+
+def _log_mel_frames(y, sr):
+    mel_spec = librosa.feature.melspectrogram(
+        y=y, sr=sr, n_mels=N_MELS, n_fft=N_FFT, hop_length=HOP_LENGTH, center=False
+    )
+    log_mel = librosa.power_to_db(mel_spec, ref=1.0, top_db=None)
+    mean = log_mel.mean(axis=0, keepdims=True)
+    std = log_mel.std(axis=0, keepdims=True)
+    return (log_mel - mean) / (std + 1e-6)
+
+def extract_log_mel_frames(audio_path_or_array, sr=16000, duration=4.0):
+    """
+    Causal Log-Mel frames for the streaming model.
+    Returns Tensor [n_mels, frames] (no image channel, time is the sequence axis).
+    """
+    target_len = int(sr * duration)
+    n_frames = 1 + (target_len - N_FFT) // HOP_LENGTH
+
+    if isinstance(audio_path_or_array, str):
+        try:
+            y, _ = librosa.load(audio_path_or_array, sr=sr)
+        except Exception as e:
+            print(f"Error reading audio file: {e}")
+            return torch.zeros(N_MELS, n_frames)
+    else:
+        y = audio_path_or_array
+
+    if len(y) < target_len:
+        y = np.pad(y, (0, target_len - len(y)))
+    else:
+        y = y[:target_len]
+
+    return torch.tensor(_log_mel_frames(y, sr), dtype=torch.float32)
+
+class StreamingLogMel:
+    """
+    Incremental version of extract_log_mel_frames for one live session.
+    Keeps only the last (n_fft - hop) samples between calls.
+    """
+
+    def __init__(self, sr=16000):
+        self.sr = sr
+        self.carry = np.zeros(0, dtype=np.float32)
+
+    def push(self, samples):
+        """Returns Tensor [n_mels, new_frames] (new_frames may be 0)."""
+        y = np.concatenate([self.carry, np.asarray(samples, dtype=np.float32)])
+        if len(y) < N_FFT:
+            self.carry = y
+            return torch.zeros(N_MELS, 0)
+
+        n_frames = 1 + (len(y) - N_FFT) // HOP_LENGTH
+        used = (n_frames - 1) * HOP_LENGTH + N_FFT
+        frames = _log_mel_frames(y[:used], self.sr)
+        self.carry = y[n_frames * HOP_LENGTH:]
+        return torch.tensor(frames, dtype=torch.float32)
@@ -0,0 +1,41 @@
+import json
+import os
+
+import torch
+
+from utils.features import set_feature_backend
+
+# Written by scripts/autotune.py, read by DeepfakeDetector at startup
+SERVING_PROFILE_PATH = os.getenv("SERVING_PROFILE", "serving_profile.json")
+
+def load_serving_profile(path=SERVING_PROFILE_PATH):
+    """Returns the tuned settings for this host, or {} if autotune was never run."""
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path) as f:
+            return json.load(f).get("settings", {})
+    except Exception as e:
+        print(f"⚠️ Could not read serving profile: {e}")
+        return {}
+
+def apply_serving_profile(profile):
+    """
+    Applies thread counts and feature backend. Must run before the first
+    inference: torch only accepts set_num_interop_threads once, up front.
+    """
+    if not profile:
+        return profile
+
+    if profile.get("intra_op_threads"):
+        torch.set_num_threads(int(profile["intra_op_threads"]))
+    if profile.get("inter_op_threads"):
+        try:
+            torch.set_num_interop_threads(int(profile["inter_op_threads"]))
+        except RuntimeError as e:
+            print(f"⚠️ Inter-op threads already fixed: {e}")
+    if profile.get("feature_backend"):
+        profile["feature_backend"] = set_feature_backend(profile["feature_backend"])
+
+    print(f"⚙️  Serving profile: {profile}")
+    return profile
@@ -380,6 +380,9 @@ export default function WebRTCCall() {
         body: formData,
       });
 
+      // Server under load skipped this chunk (already decided call or overloaded)
+      if (response.status === 503) return;
+
       if (!response.ok) {
         const errorText = await response.text();
         throw new Error(`ML analysis failed: ${errorText}`);
@@ -2,20 +2,59 @@
 
 import { motion } from "framer-motion";
 
-export function DetectionTimeline() {
-    // Mock data for the timeline
-    const timelineData = Array.from({ length: 20 }, (_, i) => ({
-        id: i,
-        status: Math.random() > 0.8 ? "fake" : "real",
-        timestamp: new Date(Date.now() - (20 - i) * 1000).toISOString(),
-        confidence: 85 + Math.random() * 15,
-    }));
+// Shape of the "timeline" array returned by POST /analyze-stream
+export interface TimelineSegment {
+    id: number;
+    status: string;     // "real" | "fake" | "error"
+    confidence: number; // 0-100, confidence in the shown status
+    start?: number;     // seconds from start of recording
+    end?: number;
+}
+
+// Per-status styling; "error" (window could not be scored) stays neutral
+const STATUS_STYLES: Record<string, { fill: string; bar: string; label: string }> = {
+    real: { fill: "bg-success/20 hover:bg-success/40", bar: "bg-success", label: "REAL" },
+    fake: { fill: "bg-danger/20 hover:bg-danger/40", bar: "bg-danger", label: "FAKE" },
+    error: { fill: "bg-gray-500/20 hover:bg-gray-500/40", bar: "bg-gray-500", label: "NOT ANALYZED" },
+};
+
+// Whole timeline finishes animating within this, however many segments it has
+const MAX_STAGGER_SECONDS = 1;
+
+// Windows overlap (e.g. 4 s window, 2 s hop), so each one is drawn from its
+// start up to the next window's start: non-overlapping, time-aligned slices.
+// Returns left/width in percent, or null when segments carry no timing.
+function layoutSegments(segments: TimelineSegment[]) {
+    if (!segments.every((s) => s.start !== undefined && s.end !== undefined)) return null;
+    const total = Math.max(0, ...segments.map((s) => s.end!));
+    if (total <= 0) return null;
+    return segments.map((segment, i) => {
+        const next = segments[i + 1];
+        const sliceEnd = next ? Math.min(segment.end!, next.start!) : segment.end!;
+        return {
+            left: (segment.start! / total) * 100,
+            width: (Math.max(0, sliceEnd - segment.start!) / total) * 100,
+        };
+    });
+}
+
+export function DetectionTimeline({ segments }: { segments?: TimelineSegment[] }) {
+    // Mock data for the timeline (used until real segments are passed in)
+    const timelineData: TimelineSegment[] = segments
+        ? [...segments].sort((a, b) => (a.start ?? 0) - (b.start ?? 0))
+        : Array.from({ length: 20 }, (_, i) => ({
+            id: i,
+            status: Math.random() > 0.8 ? "fake" : "real",
+            confidence: 85 + Math.random() * 15,
+        }));
+    const layout = layoutSegments(timelineData);
+    const stagger = Math.min(0.05, MAX_STAGGER_SECONDS / Math.max(1, timelineData.length));
 
     return (
         <section className="container mx-auto px-4 py-8 mb-12">
             <div className="flex items-center justify-between mb-4">
                 <h3 className="text-sm text-gray-400 uppercase tracking-widest font-semibold">
-                    Detection Timeline (Last 20s)
+                    {segments ? "Detection Timeline" : "Detection Timeline (Last 20s)"}
                 </h3>
                 <div className="flex gap-4 text-xs">
                     <div className="flex items-center gap-2">
@@ -30,27 +69,35 @@ export function DetectionTimeline() {
             </div>
 
             <div className="relative w-full h-16 bg-black/50 rounded-lg overflow-hidden flex border border-border">
-                {timelineData.map((segment, i) => (
+                {timelineData.map((segment, i) => {
+                    const style = STATUS_STYLES[segment.status] ?? STATUS_STYLES.error;
+                    const slice = layout?.[i];
+                    return (
                     <motion.div
                         key={segment.id}
                         initial={{ opacity: 0, scaleY: 0 }}
                         animate={{ opacity: 1, scaleY: 1 }}
-                        transition={{ delay: i * 0.05 }}
-                        className={`flex-1 h-full border-r border-black/20 relative group cursor-pointer ${segment.status === "real" ? "bg-success/20 hover:bg-success/40" : "bg-danger/20 hover:bg-danger/40"
-                            }`}
+                        transition={{ delay: i * stagger }}
+                        className={`${slice ? "absolute top-0" : "flex-1 relative"} h-full border-r border-black/20 group cursor-pointer ${style.fill}`}
+                        style={slice ? { left: `${slice.left}%`, width: `${slice.width}%` } : undefined}
                     >
                         {/* Timeline bar height indicator of confidence maybe? just full height for now */}
-                        <div className={`absolute bottom-0 left-0 right-0 ${segment.status === "real" ? "bg-success" : "bg-danger"
-                            }`} style={{ height: "4px" }} />
+                        <div className={`absolute bottom-0 left-0 right-0 ${style.bar}`} style={{ height: "4px" }} />
 
                         {/* Tooltip */}
                         <div className="absolute bottom-full left-1/2 -translate-x-1/2 mb-2 p-2 bg-panel border border-border rounded shadow-xl text-xs whitespace-nowrap opacity-0 group-hover:opacity-100 transition-opacity z-10 pointer-events-none">
-                            <p className="font-bold text-white">{segment.status === "real" ? "REAL" : "FAKE"}</p>
-                            <p className="text-gray-400">Conf: {segment.confidence.toFixed(1)}%</p>
+                            <p className="font-bold text-white">{style.label}</p>
+                            {segment.status !== "error" && (
+                                <p className="text-gray-400">Conf: {segment.confidence.toFixed(1)}%</p>
+                            )}
+                            {segment.start !== undefined && segment.end !== undefined && (
+                                <p className="text-gray-500 text-[10px]">{segment.start.toFixed(1)}s – {segment.end.toFixed(1)}s</p>
+                            )}
                             <p className="text-gray-500 text-[10px]">Model: XP-Voice-v2</p>
                         </div>
                     </motion.div>
-                ))}
+                    );
+                })}
                 {/* Scanning line */}
                 <div className="absolute top-0 bottom-0 w-[2px] bg-primary shadow-[0_0_10px_#00f0ff] animate-[scan_4s_linear_infinite]" style={{ right: 0 }} />
             </div>